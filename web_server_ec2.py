@@ -5,26 +5,57 @@ Flask server for managing scraping jobs with S3 integration
 Runs directly on EC2 - no SSH needed
 """
 
+import io
 import os
+import re
 import sys
+import selectors
+import shutil
+import mimetypes
 import json
 import time
+import queue
 import threading
 import subprocess
+import zlib
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import logging
+import psutil
+import ijson
 import boto3
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for request.json and jsonify"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
 CORS(app)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 # Configuration - EC2 Version (no SSH needed)
 SCRAPER_PATH = "/home/ec2-user/ultimate_scraper_v2.py"
@@ -36,10 +67,55 @@ S3_TEXT_BUCKET_NAME = 'bockscraper1'
 S3_SUMMARY_BUCKET_NAME = 'bockscraper2'
 AWS_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
 
+# S3 fan-out - the connection pool must be larger than the worker count
+S3_MAX_WORKERS = 32
+S3_UPLOAD_CONCURRENCY = 64
+# A scrape upload, a conversion and a summarization can all run at once on the shared client
+S3_POOL_CONNECTIONS = S3_UPLOAD_CONCURRENCY + 2 * S3_MAX_WORKERS
+
+# Shared S3 client - thread-safe, and reusing its connection pool avoids a TLS handshake per request
+S3 = boto3.client('s3', region_name=AWS_REGION, config=Config(
+    max_pool_connections=S3_POOL_CONNECTIONS,
+    retries={'max_attempts': 10, 'mode': 'adaptive'},
+    tcp_keepalive=True
+))
+# Scrape output is many small files - upload them all concurrently over the shared client
+UPLOAD_TRANSFER_CONFIG = TransferConfig(max_concurrency=S3_UPLOAD_CONCURRENCY, max_io_queue=1000)
+
+# Top-level article JSON fields used by the text conversion
+ARTICLE_FIELDS = ('title', 'author', 'date', 'content', 'text', 'article')
+ARTICLE_SELECT_EXPRESSION = 'SELECT s."title", s."author", s."date", s."content", s."text", s."article" FROM S3Object s'
+# S3 Select is closed to new AWS accounts - these errors mean it will never work for this bucket
+S3_SELECT_UNAVAILABLE_CODES = {'MethodNotAllowed', 'NotImplemented', 'UnsupportedOperation'}
+
+# Session listings are reused between conversion and summarization for this long (seconds)
+LIST_CACHE_TTL = 300
+
+# AI model configuration - quantized ONNX exports are cached here across restarts
+TEXT_SUMMARY_MODEL = "sshleifer/distilbart-cnn-6-6"
+TEXT_BATCH_SIZE = 16
+IMAGE_CAPTION_MODEL = "Salesforce/blip-image-captioning-base"
+IMAGE_BATCH_SIZE = 8
+# Object bodies fetched ahead of inference - enough to fill the next batch, not the whole page
+MAX_FETCHES_IN_FLIGHT = 2 * max(TEXT_BATCH_SIZE, IMAGE_BATCH_SIZE)
+ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', '/home/ec2-user/onnx_models')
+PHYSICAL_CORES = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+os.environ.setdefault('OMP_NUM_THREADS', str(PHYSICAL_CORES))
+
+# Background jobs (scraping, conversion, summarization) share one bounded pool.
+# job_lock makes the "already running?" check and the submit a single step. The check
+# looks at each kind's future, so there is at most one job per kind and none ever queue
+JOB_WORKERS = 4
+_JOBS = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+job_lock = threading.Lock()
+
 # Global state
-scraping_active = False
+log_lock = threading.Lock()
+_status_cache = {}  # status endpoint -> (state signature, serialized body)
+
 current_job = None
-all_logs = []
+all_logs = deque(maxlen=500)
+logs_version = 0
 scraping_stats = {
     'articlesFound': 0,
     'articlesSaved': 0,
@@ -49,76 +125,279 @@ scraping_stats = {
     'sessionId': None
 }
 
-conversion_active = False
-conversion_logs = []
+conversion_future = None
+s3_select_available = True
+_list_cache = {}  # (bucket, prefix) -> (listed_at, [page Contents, ...])
+conversion_logs = deque(maxlen=200)
+conversion_logs_version = 0
 conversion_stats = {'completed': False, 'error': None, 'targetBucket': None}
 
-summarization_active = False
-summarization_logs = []
+summarization_future = None
+summarization_logs = deque(maxlen=300)
+summarization_logs_version = 0
 summarization_stats = {
     'completed': False, 'error': None, 'targetBucket': S3_SUMMARY_BUCKET_NAME,
     'textSummaries': 0, 'imageSummaries': 0, 'totalFolders': 0
 }
 
 def add_log(message, log_type="info"):
+    global logs_version
     timestamp = datetime.now().strftime("%H:%M:%S")
-    log_entry = {'timestamp': timestamp, 'message': message, 'type': log_type}
-    all_logs.append(log_entry)
+    with log_lock:
+        log_entry = {'id': logs_version, 'timestamp': timestamp, 'message': message, 'type': log_type}
+        all_logs.append(log_entry)
+        logs_version += 1
     logger.info(f"[{log_type}] {message}")
-    if len(all_logs) > 500:
-        all_logs.pop(0)
 
 def add_conversion_log(message, log_type="info"):
+    global conversion_logs_version
     timestamp = datetime.now().strftime("%H:%M:%S")
-    log_entry = {'timestamp': timestamp, 'message': message, 'type': log_type}
-    conversion_logs.append(log_entry)
+    with log_lock:
+        log_entry = {'id': conversion_logs_version, 'timestamp': timestamp, 'message': message, 'type': log_type}
+        conversion_logs.append(log_entry)
+        conversion_logs_version += 1
     logger.info(f"[CONVERT][{log_type}] {message}")
-    if len(conversion_logs) > 200:
-        conversion_logs.pop(0)
 
 def add_summarization_log(message, log_type="info"):
+    global summarization_logs_version
     timestamp = datetime.now().strftime("%H:%M:%S")
-    log_entry = {'timestamp': timestamp, 'message': message, 'type': log_type}
-    summarization_logs.append(log_entry)
+    with log_lock:
+        log_entry = {'id': summarization_logs_version, 'timestamp': timestamp, 'message': message, 'type': log_type}
+        summarization_logs.append(log_entry)
+        summarization_logs_version += 1
     logger.info(f"[SUMMARIZE][{log_type}] {message}")
-    if len(summarization_logs) > 300:
-        summarization_logs.pop(0)
+
+def _submit_job(name, fn, *args):
+    """Run a background job on the shared pool, logging how long it took"""
+    started = time.time()
+    future = _JOBS.submit(fn, *args)
+    future.add_done_callback(lambda f: logger.info(f"[JOB] {name} finished in {time.time() - started:.1f}s"))
+    return future
+
+def _job_running(future):
+    """True while a submitted job has not finished (None means never started)"""
+    return future is not None and not future.done()
+
+def _status_response(name, version, logs, payload):
+    """Serve a status payload with an ETag, answering polls with no changes with 304 Not Modified.
+    
+    ?since=<logsVersion> returns only the log entries added after the client's last poll.
+    Without it the full serialized body is cached until the logs or status fields change.
+    """
+    signature = (version, len(logs), tuple(payload.items()))
+    etag = f"{version}-{zlib.crc32(repr(signature).encode('utf-8')):08x}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        since = request.args.get('since', type=int)
+        if since is None:
+            cached = _status_cache.get(name)
+            if cached is None or cached[0] != signature:
+                with log_lock:
+                    entries = list(logs)
+                next_id = entries[-1]['id'] + 1 if entries else version
+                cached = (signature, _dump_json_bytes({'logs': entries, 'logsVersion': next_id, **payload}))
+                _status_cache[name] = cached
+            body = cached[1]
+        else:
+            with log_lock:
+                first_id = logs[0]['id'] if logs else version
+                # A since from before a restart (ahead of us) gets the whole buffer
+                skip = since - first_id if first_id <= since <= version else 0
+                entries = list(islice(logs, skip, None))
+            next_id = entries[-1]['id'] + 1 if entries else version
+            body = _dump_json_bytes({'logs': entries, 'logsVersion': next_id, **payload})
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _cache_listing(cache_key, listed_at, pages):
+    now = time.time()
+    for key, (cached_at, _) in list(_list_cache.items()):
+        if now - cached_at >= LIST_CACHE_TTL:
+            _list_cache.pop(key, None)
+    _list_cache[cache_key] = (listed_at, pages)
+
+def _iter_session_pages(bucket, prefix):
+    """Yield the Contents of each ListObjectsV2 page (up to 1000 keys) under a session prefix.
+    
+    Listings are cached for LIST_CACHE_TTL so converting and then summarizing a session only
+    walks it once. On a miss, pages after the first are read ahead in a background thread so
+    the next page is already listed while the caller works through the current one.
+    """
+    cache_key = (bucket, prefix)
+    cached = _list_cache.get(cache_key)
+    if cached and time.time() - cached[0] < LIST_CACHE_TTL:
+        yield from cached[1]
+        return
+    
+    listed_at = time.time()
+    first = S3.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1000)
+    pages = [first.get('Contents', [])]
+    
+    # Most sessions fit in a single page - no read-ahead thread needed
+    if not first.get('IsTruncated'):
+        yield pages[0]
+        _cache_listing(cache_key, listed_at, pages)
+        return
+    
+    ahead = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                ahead.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce(token):
+        try:
+            while token:
+                response = S3.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1000, ContinuationToken=token)
+                if not put(response.get('Contents', [])):
+                    return
+                token = response.get('NextContinuationToken') if response.get('IsTruncated') else None
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+    
+    threading.Thread(target=produce, args=(first['NextContinuationToken'],), daemon=True).start()
+    try:
+        yield pages[0]
+        while True:
+            item = ahead.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            pages.append(item)
+            yield item
+    finally:
+        stop.set()
+    _cache_listing(cache_key, listed_at, pages)
+
+def _upload_directory(local_dir, bucket, prefix):
+    """Upload every file under local_dir to s3://bucket/prefix concurrently. Returns the file count"""
+    local_dir = Path(local_dir)
+    transfers = []
+    with create_transfer_manager(S3, UPLOAD_TRANSFER_CONFIG) as manager:
+        for path in local_dir.rglob('*'):
+            if not path.is_file():
+                continue
+            key = prefix + path.relative_to(local_dir).as_posix()
+            content_type = mimetypes.guess_type(path.name)[0]
+            extra_args = {'ContentType': content_type} if content_type else None
+            transfers.append(manager.upload(str(path), bucket, key, extra_args=extra_args))
+        for transfer in transfers:
+            transfer.result()
+    return len(transfers)
+
+def _is_article_json(key):
+    return key.endswith('.json') and not key.endswith('_summary.json')
+
+def _fetch_object(key):
+    """Download a single object body from the scrape bucket"""
+    response = S3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
+    return response['Body'].read()
+
+def _read_article_fields(body):
+    """Stream-parse only the fields the text conversion needs from an article JSON body"""
+    fields = {}
+    for name, value in ijson.kvitems(body, ''):
+        if name not in ARTICLE_FIELDS:
+            continue
+        fields[name] = value
+        # 'content' wins over 'text'/'article', so once it and the header fields are in, we're done
+        if fields.get('content') and all(f in fields for f in ('title', 'author', 'date')):
+            break
+    # Drain the rest unparsed so the connection goes back to the pool instead of being dropped
+    for _ in body.iter_chunks():
+        pass
+    return fields
+
+def _select_article_fields(key):
+    """Have S3 Select extract the article fields server-side so only they cross the network"""
+    response = S3.select_object_content(
+        Bucket=S3_BUCKET_NAME,
+        Key=key,
+        Expression=ARTICLE_SELECT_EXPRESSION,
+        ExpressionType='SQL',
+        InputSerialization={'JSON': {'Type': 'DOCUMENT'}},
+        OutputSerialization={'JSON': {}}
+    )
+    records = b''.join(event['Records']['Payload'] for event in response['Payload'] if 'Records' in event)
+    return json.loads(records) if records.strip() else {}
+
+def _read_article(key):
+    """Fetch the article fields, preferring S3 Select and falling back to a streamed get_object"""
+    global s3_select_available
+    if s3_select_available:
+        try:
+            return _select_article_fields(key)
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code in S3_SELECT_UNAVAILABLE_CODES:
+                s3_select_available = False
+                logger.warning(f"S3 Select unavailable ({code}), falling back to get_object")
+            else:
+                logger.warning(f"S3 Select failed for {key} ({code}), falling back to get_object")
+        except ValueError as e:
+            # Select output that isn't a single JSON record (e.g. multiple records); only this object falls back
+            logger.warning(f"S3 Select returned unparseable output for {key} ({e}), falling back to get_object")
+
+    response = S3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
+    return _read_article_fields(response['Body'])
+
+def _convert_one(key):
+    """Convert one article JSON to text. Returns the text key, or None if there was no content"""
+    data = _read_article(key)
+    
+    title = data.get('title', 'No Title')
+    author = data.get('author', 'Unknown')
+    date = data.get('date', 'Unknown')
+    text_content = data.get('content', '') or data.get('text', '') or data.get('article', '')
+    
+    if not text_content:
+        return None
+    
+    formatted_text = f"Title: {title}\nAuthor: {author}\nDate: {date}\n\nContent:\n{text_content}"
+    txt_key = key.replace('.json', '.txt')
+    S3.put_object(
+        Bucket=S3_TEXT_BUCKET_NAME,
+        Key=txt_key,
+        Body=formatted_text.encode('utf-8'),
+        ContentType='text/plain'
+    )
+    return txt_key
 
 def _run_conversion(source_session):
-    global conversion_active, conversion_stats
+    global conversion_stats
     try:
         add_conversion_log(f"Starting conversion for session: {source_session}", "info")
         
-        s3 = boto3.client('s3', region_name=AWS_REGION)
         prefix = f"{source_session}/"
         
         add_conversion_log(f"Listing files in s3://{S3_BUCKET_NAME}/{prefix}", "info")
-        paginator = s3.get_paginator('list_objects_v2')
         
         files_converted = 0
-        for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=prefix):
-            for obj in page.get('Contents', []):
-                key = obj['Key']
-                if key.endswith('.json') and not key.endswith('_summary.json'):
+        with ThreadPoolExecutor(max_workers=S3_MAX_WORKERS) as executor:
+            for contents in _iter_session_pages(S3_BUCKET_NAME, prefix):
+                futures = {
+                    executor.submit(_convert_one, obj['Key']): obj['Key']
+                    for obj in contents
+                    if _is_article_json(obj['Key'])
+                }
+                for future in as_completed(futures):
+                    key = futures[future]
                     try:
-                        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
-                        content = response['Body'].read().decode('utf-8')
-                        data = json.loads(content)
-                        
-                        title = data.get('title', 'No Title')
-                        author = data.get('author', 'Unknown')
-                        date = data.get('date', 'Unknown')
-                        text_content = data.get('content', '') or data.get('text', '') or data.get('article', '')
-                        
-                        if text_content:
-                            formatted_text = f"Title: {title}\nAuthor: {author}\nDate: {date}\n\nContent:\n{text_content}"
-                            txt_key = key.replace('.json', '.txt')
-                            s3.put_object(
-                                Bucket=S3_TEXT_BUCKET_NAME,
-                                Key=txt_key,
-                                Body=formatted_text.encode('utf-8'),
-                                ContentType='text/plain'
-                            )
+                        txt_key = future.result()
+                        if txt_key:
                             files_converted += 1
                             add_conversion_log(f"Converted: {key} -> {txt_key}", "success")
                         else:
@@ -133,94 +412,234 @@ def _run_conversion(source_session):
     except Exception as e:
         conversion_stats['error'] = str(e)
         add_conversion_log(f"Conversion failed: {str(e)}", "error")
-    finally:
-        conversion_active = False
+
+def _dump_json_bytes(data):
+    """Compact JSON bytes - orjson when installed, stdlib otherwise"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _put_summary(summary_key, summary_data):
+    S3.put_object(
+        Bucket=S3_SUMMARY_BUCKET_NAME,
+        Key=summary_key,
+        Body=_dump_json_bytes(summary_data),
+        ContentType='application/json'
+    )
+
+@lru_cache(maxsize=1)
+def _load_text_summarizer():
+    """Load the int8-quantized ONNX export of distilbart, exporting and quantizing it on first use.
+    Cached, so the model is loaded once per process and reused by every summarization job"""
+    import onnxruntime
+    from transformers import AutoTokenizer
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    
+    add_summarization_log("Loading text summarization model (distilbart, ONNX int8)...", "info")
+    model_name = TEXT_SUMMARY_MODEL.split('/')[-1]
+    export_dir = Path(ONNX_MODEL_DIR) / model_name
+    quantized_dir = Path(ONNX_MODEL_DIR) / f"{model_name}-int8"
+    
+    if not quantized_dir.is_dir():
+        add_summarization_log("Exporting distilbart to ONNX (first run only)...", "info")
+        model = ORTModelForSeq2SeqLM.from_pretrained(TEXT_SUMMARY_MODEL, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(TEXT_SUMMARY_MODEL).save_pretrained(export_dir)
+        
+        # Quantize into a scratch dir so an interrupted run is not mistaken for a finished cache
+        tmp_dir = quantized_dir.with_name(quantized_dir.name + '.tmp')
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        for onnx_file in export_dir.glob('*.onnx'):
+            quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=onnx_file.name)
+            quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+        # Config and tokenizer files travel with the int8 graphs; the fp32 export is never read again
+        for extra_file in export_dir.iterdir():
+            if extra_file.is_file() and extra_file.suffix not in ('.onnx', '.onnx_data'):
+                shutil.copy2(extra_file, tmp_dir / extra_file.name)
+        os.replace(tmp_dir, quantized_dir)
+        shutil.rmtree(export_dir, ignore_errors=True)
+    
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = PHYSICAL_CORES
+    model = ORTModelForSeq2SeqLM.from_pretrained(quantized_dir, session_options=session_options)
+    tokenizer = AutoTokenizer.from_pretrained(quantized_dir)
+    return model, tokenizer
+
+def _configure_torch_for_inference():
+    """Size torch's CPU thread pools. Autograd is disabled per call with inference_mode, since
+    set_grad_enabled only applies to the thread that calls it"""
+    import torch
+    
+    torch.set_num_threads(PHYSICAL_CORES)
+    if torch.get_num_interop_threads() != 2:
+        try:
+            torch.set_num_interop_threads(2)
+        except RuntimeError:
+            # Can only be set before the first inter-op parallel work in the process
+            pass
+
+def _summarize_text_batch(model, tokenizer, batch):
+    """Summarize a batch of (key, text) pairs in one generate call. Returns (key, summary) pairs"""
+    import torch
+    
+    # Similar lengths in a batch keep padding (wasted matmul work) to a minimum
+    batch = sorted(batch, key=lambda item: len(item[1]))
+    keys = [key for key, _ in batch]
+    inputs = tokenizer([text for _, text in batch], truncation=True, max_length=1024, padding=True, return_tensors='pt')
+    # The ORT model runs in onnxruntime, so inference_mode has no effect on the session itself;
+    # it only keeps the torch tensors generate() builds around it free of autograd tracking
+    with torch.inference_mode():
+        output_ids = model.generate(**inputs, max_length=150, min_length=40, num_beams=1)
+    return list(zip(keys, tokenizer.batch_decode(output_ids, skip_special_tokens=True)))
+
+@lru_cache(maxsize=1)
+def _load_image_captioner():
+    """Load BLIP with the Linear layers of its vision encoder dynamically quantized to int8.
+    Cached like _load_text_summarizer"""
+    import torch
+    from transformers import BlipForConditionalGeneration, BlipProcessor
+    
+    add_summarization_log("Loading image captioning model (BLIP, int8 vision encoder)...", "info")
+    processor = BlipProcessor.from_pretrained(IMAGE_CAPTION_MODEL)
+    model = BlipForConditionalGeneration.from_pretrained(IMAGE_CAPTION_MODEL).eval()
+    torch.ao.quantization.quantize_dynamic(model.vision_model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model, processor
+
+def _caption_image_batch(model, processor, batch):
+    """Caption a batch of (key, image) pairs in one generate call. Returns (key, caption) pairs"""
+    import torch
+    
+    keys = [key for key, _ in batch]
+    inputs = processor(images=[img for _, img in batch], return_tensors='pt')
+    with torch.inference_mode():
+        output_ids = model.generate(**inputs)
+    return list(zip(keys, processor.batch_decode(output_ids, skip_special_tokens=True)))
 
 def _run_summarization(source_session):
-    global summarization_active, summarization_stats
+    global summarization_stats
     try:
         add_summarization_log(f"Starting AI summarization for session: {source_session}", "info")
         
-        s3 = boto3.client('s3', region_name=AWS_REGION)
         prefix = f"{source_session}/"
         
         add_summarization_log(f"Listing files in s3://{S3_BUCKET_NAME}/{prefix}", "info")
-        paginator = s3.get_paginator('list_objects_v2')
         
         # Check if transformers is available
         try:
             import transformers
-            from transformers import pipeline
+            import optimum.onnxruntime
             from PIL import Image
-            import tempfile
             add_summarization_log("AI libraries loaded successfully", "info")
         except ImportError as ie:
-            raise Exception(f"Missing AI libraries: {str(ie)}. Run: pip install transformers torch pillow")
+            raise Exception(f"Missing AI libraries: {str(ie)}. Run: pip install transformers torch pillow optimum-onnx[onnxruntime]")
         
-        add_summarization_log("Loading text summarization model (distilbart)...", "info")
-        text_summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-6-6", device="cpu")
+        _configure_torch_for_inference()
         
-        add_summarization_log("Loading image captioning model (BLIP-tiny)...", "info")
-        image_captioner = pipeline("image-to-text", model="Salesforce/blip-image-captioning-base", device="cpu")
+        text_model, text_tokenizer = _load_text_summarizer()
+        image_model, image_processor = _load_image_captioner()
+        add_summarization_log("AI models ready", "info")
         
         text_count = 0
         image_count = 0
         
-        for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=prefix):
-            for obj in page.get('Contents', []):
-                key = obj['Key']
+        with ThreadPoolExecutor(max_workers=S3_MAX_WORKERS) as executor:
+            def summarize_batch(batch, uploads):
+                for key, _ in batch:
+                    add_summarization_log(f"Summarizing text: {key}", "info")
+                try:
+                    results = _summarize_text_batch(text_model, text_tokenizer, batch)
+                except Exception as e:
+                    for key, _ in batch:
+                        add_summarization_log(f"Error summarizing {key}: {str(e)}", "error")
+                    return
+                for key, summary in results:
+                    summary_data = {'filename': key.split('/')[-1], 'summary_type': 'text', 'summary': summary}
+                    summary_key = key.replace('.json', '_text_summary.json')
+                    upload = executor.submit(_put_summary, summary_key, summary_data)
+                    uploads[upload] = ('text', key, summary_key)
+            
+            def caption_batch(batch, uploads):
+                for key, _ in batch:
+                    add_summarization_log(f"Captioning image: {key}", "info")
+                try:
+                    results = _caption_image_batch(image_model, image_processor, batch)
+                except Exception as e:
+                    for key, _ in batch:
+                        add_summarization_log(f"Error captioning {key}: {str(e)}", "error")
+                    return
+                for key, caption in results:
+                    caption_data = {'filename': key.split('/')[-1], 'summary_type': 'image', 'summary': caption}
+                    caption_key = key.rsplit('.', 1)[0] + '_image_summary.json'
+                    upload = executor.submit(_put_summary, caption_key, caption_data)
+                    uploads[upload] = ('image', key, caption_key)
+            
+            for contents in _iter_session_pages(S3_BUCKET_NAME, prefix):
+                pending_keys = iter([
+                    obj['Key'] for obj in contents
+                    if _is_article_json(obj['Key']) or obj['Key'].lower().endswith(('.jpg', '.jpeg', '.png'))
+                ])
+                fetches = {}
+                uploads = {}
+                # Texts are bucketed by length (128-char steps) so each batch pads to a similar size
+                text_buckets = {}
+                image_batch = []
                 
-                # Process JSON files
-                if key.endswith('.json') and not key.endswith('_summary.json'):
-                    try:
-                        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
-                        content = response['Body'].read().decode('utf-8')
-                        data = json.loads(content)
-                        text = data.get('content', '') or data.get('text', '')
+                # Inference runs on this thread as bodies arrive; uploads go back to the pool.
+                # Fetches are topped up as results are consumed so only a bounded number of bodies is held.
+                while True:
+                    for key in islice(pending_keys, MAX_FETCHES_IN_FLIGHT - len(fetches)):
+                        fetches[executor.submit(_fetch_object, key)] = key
+                    if not fetches:
+                        break
+                    done, _ = wait(fetches, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key = fetches.pop(future)
+                        # Process JSON files
+                        if _is_article_json(key):
+                            try:
+                                data = json.loads(future.result().decode('utf-8'))
+                                text = data.get('content', '') or data.get('text', '')
+                                
+                                if text and len(text) > 100:
+                                    text = text[:1024]
+                                    bucket_id = len(text) // 128
+                                    bucket = text_buckets.setdefault(bucket_id, [])
+                                    bucket.append((key, text))
+                                    if len(bucket) >= TEXT_BATCH_SIZE:
+                                        summarize_batch(text_buckets.pop(bucket_id), uploads)
+                            except Exception as e:
+                                add_summarization_log(f"Error summarizing {key}: {str(e)}", "error")
                         
-                        if text and len(text) > 100:
-                            add_summarization_log(f"Summarizing text: {key}", "info")
-                            summary = text_summarizer(text[:1024], max_length=150, min_length=40, do_sample=False)[0]['summary_text']
-                            
-                            summary_data = {'filename': key.split('/')[-1], 'summary_type': 'text', 'summary': summary}
-                            summary_key = key.replace('.json', '_text_summary.json')
-                            s3.put_object(
-                                Bucket=S3_SUMMARY_BUCKET_NAME,
-                                Key=summary_key,
-                                Body=json.dumps(summary_data, indent=2).encode('utf-8'),
-                                ContentType='application/json'
-                            )
-                            text_count += 1
-                            add_summarization_log(f"✓ Text summary saved: {summary_key}", "success")
-                    except Exception as e:
-                        add_summarization_log(f"Error summarizing {key}: {str(e)}", "error")
+                        # Process images
+                        else:
+                            try:
+                                image_batch.append((key, Image.open(io.BytesIO(future.result())).convert('RGB')))
+                                if len(image_batch) >= IMAGE_BATCH_SIZE:
+                                    caption_batch(image_batch, uploads)
+                                    image_batch = []
+                            except Exception as e:
+                                add_summarization_log(f"Error captioning {key}: {str(e)}", "error")
+                
+                for batch in text_buckets.values():
+                    summarize_batch(batch, uploads)
+                if image_batch:
+                    caption_batch(image_batch, uploads)
                 
-                # Process images
-                elif key.lower().endswith(('.jpg', '.jpeg', '.png')):
+                for upload in as_completed(uploads):
+                    kind, key, summary_key = uploads[upload]
                     try:
-                        add_summarization_log(f"Captioning image: {key}", "info")
-                        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)
-                        
-                        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                            tmp.write(response['Body'].read())
-                            tmp_path = tmp.name
-                        
-                        img = Image.open(tmp_path).convert('RGB')
-                        caption = image_captioner(img)[0]['generated_text']
-                        os.unlink(tmp_path)
-                        
-                        caption_data = {'filename': key.split('/')[-1], 'summary_type': 'image', 'summary': caption}
-                        caption_key = key.rsplit('.', 1)[0] + '_image_summary.json'
-                        s3.put_object(
-                            Bucket=S3_SUMMARY_BUCKET_NAME,
-                            Key=caption_key,
-                            Body=json.dumps(caption_data, indent=2).encode('utf-8'),
-                            ContentType='application/json'
-                        )
-                        image_count += 1
-                        add_summarization_log(f"✓ Image caption saved: {caption_key}", "success")
+                        upload.result()
+                        if kind == 'text':
+                            text_count += 1
+                            add_summarization_log(f"✓ Text summary saved: {summary_key}", "success")
+                        else:
+                            image_count += 1
+                            add_summarization_log(f"✓ Image caption saved: {summary_key}", "success")
                     except Exception as e:
-                        add_summarization_log(f"Error captioning {key}: {str(e)}", "error")
+                        action = 'summarizing' if kind == 'text' else 'captioning'
+                        add_summarization_log(f"Error {action} {key}: {str(e)}", "error")
         
         summarization_stats['textSummaries'] = text_count
         summarization_stats['imageSummaries'] = image_count
@@ -230,27 +649,32 @@ def _run_summarization(source_session):
     except Exception as e:
         summarization_stats['error'] = str(e)
         add_summarization_log(f"Summarization failed: {str(e)}", "error")
-    finally:
-        summarization_active = False
 
 class LocalScrapingJob:
     """Run scraper locally on EC2 (no SSH)"""
+    _ERR_RE = re.compile(r'error|failed|exception', re.I)
+    _OK_RE = re.compile(r'success|saved|complete', re.I)
+    _WARN_RE = re.compile(r'warning|filtered', re.I)
+    # Groups: 1 = article saved, 2 = image saved, 3 = completion marker
+    _SAVE_RE = re.compile(r'(SAVED:.*article\.json)|(SUCCESS: Saved.*image\.jpg)|((?i:complete))')
+    
     def __init__(self, url, max_articles):
         self.url = url
         self.max_articles = max_articles
         self.start_time = time.time()
         self.process = None
-        self.process_thread = None
+        self.future = None
         self.is_running = False
         self.session_id = f"session_{int(time.time())}"
         
     def start(self):
         self.is_running = True
-        self.process_thread = threading.Thread(target=self._run_scraping)
-        self.process_thread.start()
+        self.future = _submit_job(f"scraping {self.session_id}", self._run_scraping)
         
     def stop(self):
         self.is_running = False
+        if self.future:
+            self.future.cancel()
         if self.process:
             try:
                 self.process.terminate()
@@ -259,7 +683,7 @@ class LocalScrapingJob:
                 self.process.kill()
         
     def _run_scraping(self):
-        global scraping_active, scraping_stats
+        global scraping_stats
         
         try:
             add_log("Starting local scraper...", "info")
@@ -272,9 +696,7 @@ class LocalScrapingJob:
 export PATH=/usr/local/bin:/usr/bin:/bin && \
 source {SCRAPER_ENV_PATH} && \
 mkdir -p {remote_output_path} && \
-python -u {SCRAPER_PATH} "{self.url}" --max-articles {self.max_articles} --output {remote_output_path} && \
-aws s3 sync {remote_output_path}/ s3://{S3_BUCKET_NAME}/{self.session_id}/ && \
-rm -rf {remote_output_path}
+python -u {SCRAPER_PATH} "{self.url}" --max-articles {self.max_articles} --output {remote_output_path}
 """
             
             add_log(f"Scraping {self.max_articles} articles from {self.url}", "info")
@@ -282,33 +704,42 @@ rm -rf {remote_output_path}
             scraping_stats['progress'] = 15
             scraping_stats['sessionId'] = self.session_id
             
-            # Execute locally with unbuffered output
+            # Execute locally - the scraper runs unbuffered, we read its output in large chunks
             self.process = subprocess.Popen(
                 command,
                 shell=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 executable='/bin/bash',
-                text=True,
-                bufsize=0,
-                universal_newlines=True
+                bufsize=65536
             )
             
-            # Stream output
-            for line in iter(self.process.stdout.readline, ''):
-                if not self.is_running:
-                    break
-                line = line.strip()
-                if line:
-                    log_type = self._classify_log_line(line)
-                    add_log(line, log_type)
-                    self._update_stats_from_log(line)
+            # Stream output - one select wakeup drains everything buffered in the pipe
+            fd = self.process.stdout.fileno()
+            os.set_blocking(fd, False)
+            pending = b''
+            with selectors.DefaultSelector() as selector:
+                selector.register(fd, selectors.EVENT_READ)
+                while self.is_running:
+                    if not selector.select(timeout=1):
+                        continue
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    *lines, pending = (pending + chunk.replace(b'\r', b'\n')).split(b'\n')
+                    for raw_line in lines:
+                        self._handle_output_line(raw_line)
+            if pending and self.is_running:
+                self._handle_output_line(pending)
             
             self.process.wait()
             
             if self.process.returncode == 0 and self.is_running:
+                add_log(f"Uploading results to s3://{S3_BUCKET_NAME}/{self.session_id}/", "info")
+                uploaded = _upload_directory(remote_output_path, S3_BUCKET_NAME, f"{self.session_id}/")
+                shutil.rmtree(remote_output_path, ignore_errors=True)
                 add_log("Scraping completed successfully!", "success")
-                add_log(f"Files uploaded to S3: {S3_BUCKET_NAME}/{self.session_id}", "success")
+                add_log(f"Files uploaded to S3: {S3_BUCKET_NAME}/{self.session_id} ({uploaded} files)", "success")
                 scraping_stats['progress'] = 100
                 scraping_stats['completed'] = True
             else:
@@ -320,36 +751,45 @@ rm -rf {remote_output_path}
             scraping_stats['progress'] = 0
         finally:
             self.is_running = False
-            scraping_active = False
             
+    def _handle_output_line(self, raw_line):
+        line = raw_line.decode('utf-8', errors='replace').strip()
+        if line:
+            log_type = self._classify_log_line(line)
+            add_log(line, log_type)
+            self._update_stats_from_log(line)
+    
     def _classify_log_line(self, line):
-        line_lower = line.lower()
-        if any(w in line_lower for w in ['error', 'failed', 'exception']):
+        if self._ERR_RE.search(line):
             return 'error'
-        elif any(w in line_lower for w in ['success', 'saved', 'complete']):
+        elif self._OK_RE.search(line):
             return 'success'
-        elif any(w in line_lower for w in ['warning', 'filtered']):
+        elif self._WARN_RE.search(line):
             return 'warning'
         return 'info'
     
     def _update_stats_from_log(self, line):
         global scraping_stats
         
+        m = self._SAVE_RE.search(line)
+        if not m:
+            return
+        
         # Count only when article.json is SAVED (actual articles found = articles saved)
-        if "SAVED:" in line and "article.json" in line:
+        if m.group(1):
             scraping_stats['articlesFound'] = scraping_stats.get('articlesFound', 0) + 1
             scraping_stats['articlesSaved'] = scraping_stats['articlesFound']
-            progress = min(15 + (scraping_stats['articlesFound'] / self.max_articles) * 65, 80)
-            scraping_stats['progress'] = max(scraping_stats['progress'], int(progress))
+            progress = min(15 + scraping_stats['articlesFound'] * 65 // self.max_articles, 80)
+            scraping_stats['progress'] = max(scraping_stats['progress'], progress)
             
         # Count only when image.jpg is SAVED (actual save)
-        if "SUCCESS: Saved" in line and "image.jpg" in line:
+        elif m.group(2):
             scraping_stats['imagesFound'] = scraping_stats.get('imagesFound', 0) + 1
-            progress = min(80 + (scraping_stats['imagesFound'] / self.max_articles) * 15, 95)
-            scraping_stats['progress'] = max(scraping_stats['progress'], int(progress))
+            progress = min(80 + scraping_stats['imagesFound'] * 15 // self.max_articles, 95)
+            scraping_stats['progress'] = max(scraping_stats['progress'], progress)
             
         # Check for completion
-        if "COMPLETE" in line.upper():
+        else:
             scraping_stats['progress'] = 100
 
 # Flask routes
@@ -363,28 +803,28 @@ def logo():
 
 @app.route('/start_scraping', methods=['POST'])
 def start_scraping():
-    global scraping_active, current_job, scraping_stats
-    
-    if scraping_active:
-        return jsonify({'error': 'Scraping already in progress'}), 400
+    global current_job, scraping_stats
     
     data = request.json
     url = data.get('url')
     max_articles = data.get('maxArticles', 10)
     
-    if not url:
-        return jsonify({'error': 'URL is required'}), 400
-    
-    # Reset stats
-    scraping_stats = {
-        'articlesFound': 0, 'articlesSaved': 0, 'imagesFound': 0,
-        'progress': 0, 'completed': False, 'sessionId': None
-    }
-    all_logs.clear()
-    
-    scraping_active = True
-    current_job = LocalScrapingJob(url, max_articles)
-    current_job.start()
+    with job_lock:
+        if current_job is not None and _job_running(current_job.future):
+            return jsonify({'error': 'Scraping already in progress'}), 400
+        
+        if not url:
+            return jsonify({'error': 'URL is required'}), 400
+        
+        # Reset stats
+        scraping_stats = {
+            'articlesFound': 0, 'articlesSaved': 0, 'imagesFound': 0,
+            'progress': 0, 'completed': False, 'sessionId': None
+        }
+        all_logs.clear()
+        
+        current_job = LocalScrapingJob(url, max_articles)
+        current_job.start()
     
     return jsonify({
         'status': 'started',
@@ -394,19 +834,13 @@ def start_scraping():
 
 @app.route('/stop_scraping', methods=['POST'])
 def stop_scraping():
-    global scraping_active, current_job
     if current_job:
         current_job.stop()
-    scraping_active = False
     return jsonify({'status': 'stopped'})
 
 @app.route('/get_status', methods=['GET'])
 def get_status():
-    return jsonify({
-        'active': scraping_active,
-        'logs': all_logs,
-        **scraping_stats
-    })
+    return _status_response('scraping', logs_version, all_logs, {'active': current_job is not None and _job_running(current_job.future), **scraping_stats})
 
 @app.route('/list_bucket', methods=['POST'])
 def list_bucket():
@@ -415,12 +849,10 @@ def list_bucket():
     prefix = data.get('prefix', '')
     
     try:
-        s3 = boto3.client('s3', region_name=AWS_REGION)
-        
         if prefix and not prefix.endswith('/'):
             prefix += '/'
         
-        response = s3.list_objects_v2(Bucket=bucket, Prefix=prefix, Delimiter='/')
+        response = S3.list_objects_v2(Bucket=bucket, Prefix=prefix, Delimiter='/')
         
         folders = []
         files = []
@@ -453,72 +885,84 @@ def download_file():
     key = data.get('key')
     
     try:
-        s3 = boto3.client('s3', region_name=AWS_REGION)
-        file_obj = s3.get_object(Bucket=bucket, Key=key)
+        file_obj = S3.get_object(Bucket=bucket, Key=key)
+        body = file_obj['Body']
         
-        from flask import Response
-        return Response(
-            file_obj['Body'].read(),
+        # Stream in 64 KiB chunks so memory stays flat regardless of file size
+        response = Response(
+            body.iter_chunks(chunk_size=65536),
             mimetype=file_obj.get('ContentType', 'application/octet-stream'),
-            headers={'Content-Disposition': f'attachment; filename={key.split("/")[-1]}'}
+            headers={
+                'Content-Disposition': f'attachment; filename={key.split("/")[-1]}',
+                'Content-Length': str(file_obj['ContentLength'])
+            }
         )
+        response.call_on_close(body.close)
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/convert_to_text', methods=['POST'])
 def convert_to_text():
-    global conversion_active, conversion_stats
-    
-    if conversion_active:
-        return jsonify({'error': 'Conversion already in progress'}), 400
+    global conversion_stats, conversion_future
     
     data = request.json
     source_session = data.get('sourceSession', '')
     
-    if not source_session:
-        return jsonify({'error': 'sourceSession is required'}), 400
-    
-    conversion_logs.clear()
-    conversion_stats = {'completed': False, 'error': None, 'targetBucket': S3_TEXT_BUCKET_NAME, 'filesConverted': 0}
-    conversion_active = True
-    
-    thread = threading.Thread(target=_run_conversion, args=(source_session,))
-    thread.start()
+    with job_lock:
+        if _job_running(conversion_future):
+            return jsonify({'error': 'Conversion already in progress'}), 400
+        
+        if not source_session:
+            return jsonify({'error': 'sourceSession is required'}), 400
+        
+        conversion_logs.clear()
+        conversion_stats = {'completed': False, 'error': None, 'targetBucket': S3_TEXT_BUCKET_NAME, 'filesConverted': 0}
+        conversion_future = _submit_job(f"conversion {source_session}", _run_conversion, source_session)
     
     return jsonify({'status': 'started', 'message': 'Conversion started', 'targetBucket': S3_TEXT_BUCKET_NAME})
 
 @app.route('/conversion_status', methods=['GET'])
 def conversion_status():
-    return jsonify({'logs': conversion_logs, **conversion_stats})
+    return _status_response('conversion', conversion_logs_version, conversion_logs, conversion_stats)
 
 @app.route('/generate_summaries', methods=['POST'])
 def generate_summaries():
-    global summarization_active, summarization_stats
-    
-    if summarization_active:
-        return jsonify({'error': 'Summarization already in progress'}), 400
+    global summarization_stats, summarization_future
     
     data = request.json
     source_session = data.get('sourceSession', '')
     
-    if not source_session:
-        return jsonify({'error': 'sourceSession is required'}), 400
-    
-    summarization_logs.clear()
-    summarization_stats = {
-        'completed': False, 'error': None, 'targetBucket': S3_SUMMARY_BUCKET_NAME,
-        'textSummaries': 0, 'imageSummaries': 0, 'totalFolders': 0
-    }
-    summarization_active = True
-    
-    thread = threading.Thread(target=_run_summarization, args=(source_session,))
-    thread.start()
+    with job_lock:
+        if _job_running(summarization_future):
+            return jsonify({'error': 'Summarization already in progress'}), 400
+        
+        if not source_session:
+            return jsonify({'error': 'sourceSession is required'}), 400
+        
+        summarization_logs.clear()
+        summarization_stats = {
+            'completed': False, 'error': None, 'targetBucket': S3_SUMMARY_BUCKET_NAME,
+            'textSummaries': 0, 'imageSummaries': 0, 'totalFolders': 0
+        }
+        summarization_future = _submit_job(f"summarization {source_session}", _run_summarization, source_session)
     
     return jsonify({'status': 'started', 'message': 'Summarization started', 'targetBucket': S3_SUMMARY_BUCKET_NAME})
 
 @app.route('/summarization_status', methods=['GET'])
 def summarization_status():
-    return jsonify({'logs': summarization_logs, **summarization_stats})
+    return _status_response('summarization', summarization_logs_version, summarization_logs, summarization_stats)
+
+# Warm the AI models at import so the first summarization doesn't pay the load. Each gunicorn
+# worker must build its own copy - ONNX Runtime sessions and torch thread pools don't survive a
+# fork, so never combine this with gunicorn --preload
+if os.getenv('PRELOAD_AI_MODELS') == '1':
+    try:
+        _configure_torch_for_inference()
+        _load_text_summarizer()
+        _load_image_captioner()
+    except Exception as e:
+        logger.warning(f"AI model preload failed, models will load on first summarization: {e}")
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))